@@ -1,44 +1,96 @@
 # app/api/customers.py
 
-from typing import List
+from typing import AsyncIterator, List
 
+import orjson
 from fastapi import APIRouter, HTTPException, Query
-from sqlalchemy import func, select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import bindparam, func, select, text
 
-from app.db.engine import get_engine
+from app.db.engine import get_async_engine
 from app.db.schema import customers, invoices
 from app.models.customers import (
     CustomerOut,
     ContactInfo,
     CustomerContactResponse,
 )
+from app.utils.cache import ttl_cache
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
 
+# Built once at import; per-request values are passed as bound parameters.
+_CUSTOMER_COLUMNS = (
+    customers.c.id,
+    customers.c.name,
+    customers.c.contact_name,
+    customers.c.contact_phone,
+    customers.c.contact_email,
+)
+
+_EXPORT_CUSTOMERS_STMT = select(*_CUSTOMER_COLUMNS).order_by(customers.c.name)
+
+_LIST_CUSTOMERS_STMT = (
+    _EXPORT_CUSTOMERS_STMT
+    .limit(bindparam("lim"))
+    .offset(bindparam("off"))
+)
+
+# Primary-key lookup runs through the driver cursor directly: every column is
+# a plain str/int, so there is no SQLAlchemy type processing to preserve.
+_GET_CUSTOMER_SQL = (
+    "SELECT id, name, contact_name, contact_phone, contact_email"
+    " FROM customers WHERE id = ?"
+)
+
+_COUNT_CUSTOMERS_BY_NAME_STMT = text(
+    "SELECT COUNT(*) FROM customers WHERE name_lower = :name_lower"
+)
+
+_CUSTOMER_CONTACTS_STMT = (
+    select(
+        customers.c.name.label("customer_name"),
+        customers.c.contact_name,
+        customers.c.contact_email,
+        customers.c.contact_phone,
+        func.max(invoices.c.invoice_date).label("last_seen_invoice_date"),
+        # Matching customers (before limit/offset), counted per group
+        func.count().over().label("total_count"),
+    )
+    .select_from(customers.outerjoin(invoices))
+    .where(customers.c.name_lower == bindparam("name_lower"))
+    .group_by(
+        customers.c.id,
+        customers.c.name,
+        customers.c.contact_name,
+        customers.c.contact_email,
+        customers.c.contact_phone,
+    )
+    .order_by(customers.c.name)
+    .limit(bindparam("lim"))
+    .offset(bindparam("off"))
+)
+
+
 @router.get("/", response_model=List[CustomerOut])
-def list_customers() -> List[CustomerOut]:
+async def list_customers(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+) -> List[CustomerOut]:
     """
-    Return all customers with their contact info.
+    Return a page of customers with their contact info, ordered by name.
     """
-    engine = get_engine()
-
-    with engine.connect() as conn:
-        stmt = (
-            select(
-                customers.c.id,
-                customers.c.name,
-                customers.c.contact_name,
-                customers.c.contact_phone,
-                customers.c.contact_email,
-            )
-            .order_by(customers.c.name)
-        )
+    engine = get_async_engine()
 
-        rows = conn.execute(stmt).mappings().all()
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            _LIST_CUSTOMERS_STMT, {"lim": limit, "off": offset}
+        )
+        rows = result.mappings().all()
 
+    # Rows come from typed Core columns, so skip per-field validation
     return [
-        CustomerOut(
+        CustomerOut.model_construct(
             id=row["id"],
             name=row["name"],
             contact_name=row["contact_name"],
@@ -49,8 +101,43 @@ def list_customers() -> List[CustomerOut]:
     ]
 
 
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "One CustomerOut object per line",
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"$ref": "#/components/schemas/CustomerOut"}
+                }
+            },
+        }
+    },
+)
+async def export_customers() -> StreamingResponse:
+    """
+    Stream every customer as NDJSON (one JSON object per line), ordered by name.
+    """
+
+    async def generate() -> AsyncIterator[bytes]:
+        # The connection stays open for as long as the response is streaming;
+        # yield_per keeps only one batch of rows in memory at a time.
+        async with get_async_engine().connect() as conn:
+            result = await conn.stream(
+                _EXPORT_CUSTOMERS_STMT.execution_options(yield_per=500)
+            )
+            async for row in result.mappings():
+                # Column keys are str subclasses, which orjson only accepts
+                # with OPT_NON_STR_KEYS (as FastAPI's ORJSONResponse does)
+                yield orjson.dumps(dict(row), option=orjson.OPT_NON_STR_KEYS) + b"\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @router.get("/contact", response_model=CustomerContactResponse)
-def get_customer_contact(
+@ttl_cache(expire=60)
+async def get_customer_contact(
     name: str = Query(..., description="Customer name (case-insensitive exact match)"),
     limit: int = Query(10, ge=1),
     offset: int = Query(0, ge=0),
@@ -58,61 +145,45 @@ def get_customer_contact(
     """
     Fetches contact info by customer name (case-insensitive), with last_seen_invoice_date.
     """
-    engine = get_engine()
-
-    with engine.connect() as conn:
-        # Count matching customers (for total)
-        count_stmt = (
-            select(func.count())
-            .select_from(customers)
-            .where(func.lower(customers.c.name) == func.lower(name))
+    engine = get_async_engine()
+
+    async with engine.connect() as conn:
+        # Fetch contacts + last_seen_invoice_date, with the match count
+        result = await conn.execute(
+            _CUSTOMER_CONTACTS_STMT,
+            {"name_lower": name.lower(), "lim": limit, "off": offset},
         )
-        total_customers = conn.execute(count_stmt).scalar_one()
-
-        if total_customers == 0:
-            # Spec allows 404 if zero matches
-            raise HTTPException(status_code=404, detail="Customer not found")
-
-        # Fetch contacts + last_seen_invoice_date
-        stmt = (
-            select(
-                customers.c.name.label("customer_name"),
-                customers.c.contact_name,
-                customers.c.contact_email,
-                customers.c.contact_phone,
-                func.max(invoices.c.invoice_date).label("last_seen_invoice_date"),
+        rows = result.mappings().all()
+
+        if rows:
+            total_customers = rows[0]["total_count"]
+        elif offset > 0:
+            # Paged past the end: count matching customers directly
+            result = await conn.execute(
+                _COUNT_CUSTOMERS_BY_NAME_STMT, {"name_lower": name.lower()}
             )
-            .select_from(customers.outerjoin(invoices))
-            .where(func.lower(customers.c.name) == func.lower(name))
-            .group_by(
-                customers.c.id,
-                customers.c.name,
-                customers.c.contact_name,
-                customers.c.contact_email,
-                customers.c.contact_phone,
-            )
-            .order_by(customers.c.name)
-            .limit(limit)
-            .offset(offset)
-        )
+            total_customers = result.scalar()
+        else:
+            total_customers = 0
 
-        rows = conn.execute(stmt).mappings().all()
+    if total_customers == 0:
+        # Spec allows 404 if zero matches
+        raise HTTPException(status_code=404, detail="Customer not found")
 
-    contacts: List[ContactInfo] = []
-    for row in rows:
-        contacts.append(
-            ContactInfo(
-                contact_name=row["contact_name"],
-                contact_email=row["contact_email"],
-                contact_phone=row["contact_phone"],
-                last_seen_invoice_date=row["last_seen_invoice_date"],
-            )
+    contacts = [
+        ContactInfo.model_construct(
+            contact_name=row["contact_name"],
+            contact_email=row["contact_email"],
+            contact_phone=row["contact_phone"],
+            last_seen_invoice_date=row["last_seen_invoice_date"],
         )
+        for row in rows
+    ]
 
     # Use the name from the first row (they all share the same customer_name)
     customer_name = rows[0]["customer_name"] if rows else name
 
-    return CustomerContactResponse(
+    return CustomerContactResponse.model_construct(
         customer_name=customer_name,
         contacts=contacts,
         total=len(contacts),
@@ -120,34 +191,28 @@ def get_customer_contact(
 
 
 @router.get("/{customer_id}", response_model=CustomerOut)
-def get_customer(customer_id: int) -> CustomerOut:
+async def get_customer(customer_id: int) -> CustomerOut:
     """
     Return a single customer by ID.
     """
-    engine = get_engine()
-
-    with engine.connect() as conn:
-        stmt = (
-            select(
-                customers.c.id,
-                customers.c.name,
-                customers.c.contact_name,
-                customers.c.contact_phone,
-                customers.c.contact_email,
-            )
-            .where(customers.c.id == customer_id)
-        )
+    engine = get_async_engine()
 
-        row = conn.execute(stmt).mappings().first()
+    # Pooled connection, queried through the underlying aiosqlite driver
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        async with raw.driver_connection.execute(
+            _GET_CUSTOMER_SQL, (customer_id,)
+        ) as cur:
+            row = await cur.fetchone()
 
     if row is None:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    return CustomerOut(
-        id=row["id"],
-        name=row["name"],
-        contact_name=row["contact_name"],
-        contact_phone=row["contact_phone"],
-        contact_email=row["contact_email"],
+    return CustomerOut.model_construct(
+        id=row[0],
+        name=row[1],
+        contact_name=row[2],
+        contact_phone=row[3],
+        contact_email=row[4],
     )
 
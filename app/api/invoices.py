@@ -2,13 +2,13 @@
 
 from datetime import date, datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query
-from sqlalchemy import and_, func, select
+from sqlalchemy import Date, Integer, and_, bindparam, case, cast, func, select, text
 from zoneinfo import ZoneInfo
 
-from app.db.engine import get_engine
+from app.db.engine import get_async_engine
 from app.db.schema import invoices, customers
 from app.models.invoices import (
     InvoiceOut,
@@ -16,10 +16,118 @@ from app.models.invoices import (
     PastDueInvoiceItem,
     PastDueResponse,
 )
+from app.utils.cache import ttl_cache
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
 
 
+# bill_total/applied are NOT NULL; keeping the bare expression lets SQLite
+# match it against the ix_invoices_past_due partial index.
+_OUTSTANDING_EXPR = invoices.c.bill_total - invoices.c.applied
+
+# Base filter: outstanding > 0 AND due_date < as_of
+_PAST_DUE_WHERE = and_(
+    _OUTSTANDING_EXPR > 0,
+    invoices.c.due_date < bindparam("as_of"),
+)
+
+# Single-scalar count: plain SQL skips expression compilation and row mapping
+_PAST_DUE_COUNT_STMT = text(
+    "SELECT COUNT(*) FROM invoices"
+    " WHERE bill_total - applied > 0 AND due_date < :as_of"
+).bindparams(bindparam("as_of", type_=Date))
+
+
+def _past_due_page_stmt(*order_clauses):
+    return (
+        select(
+            invoices.c.invoice_number,
+            invoices.c.customer_name,
+            invoices.c.invoice_date,
+            invoices.c.due_date,
+            invoices.c.bill_total,
+            invoices.c.applied,
+            # outstanding = max(bill_total - applied, 0)
+            case(
+                (_OUTSTANDING_EXPR > 0, _OUTSTANDING_EXPR), else_=0
+            ).label("outstanding"),
+            invoices.c.currency,
+            invoices.c.status,
+            # days_past_due = (as_of - due_date).days
+            cast(
+                func.julianday(bindparam("as_of", type_=Date))
+                - func.julianday(invoices.c.due_date),
+                Integer,
+            ).label("days_past_due"),
+            # Total matches (before limit/offset) ride along on every row
+            func.count().over().label("total_count"),
+        )
+        .where(_PAST_DUE_WHERE)
+        .order_by(*order_clauses)
+        .limit(bindparam("lim"))
+        .offset(bindparam("off"))
+    )
+
+
+# invoice_number breaks due_date ties so pages are stable. The COUNT(*) OVER ()
+# total means SQLite sorts the whole past-due set on every page rather than
+# walking the index to LIMIT; we accept that to get the total in one query.
+_PAST_DUE_STMTS = {
+    "due_date.asc": _past_due_page_stmt(
+        invoices.c.due_date.asc(), invoices.c.invoice_number.asc()
+    ),
+    "due_date.desc": _past_due_page_stmt(
+        invoices.c.due_date.desc(), invoices.c.invoice_number.desc()
+    ),
+}
+
+_GET_INVOICE_STMT = (
+    select(
+        invoices.c.id,
+        invoices.c.invoice_number,
+        invoices.c.customer_id,
+        invoices.c.customer_name,
+        invoices.c.invoice_date,
+        invoices.c.due_date,
+        invoices.c.customer_po_number,
+        invoices.c.bill_total,
+        invoices.c.applied,
+        invoices.c.status,
+        invoices.c.currency,
+        invoices.c.customer_terms,
+        invoices.c.terms_days,
+    )
+    .where(invoices.c.invoice_number == bindparam("invoice_number"))
+)
+
+
+def _monthly_summary_stmt(*extra_conditions):
+    # Base filter on invoice_date range
+    return (
+        select(
+            func.coalesce(func.sum(invoices.c.bill_total), 0).label("sum_bill_total"),
+            func.count().label("count_invoices"),
+            func.coalesce(func.min(invoices.c.currency), "USD").label("currency"),
+        )
+        .select_from(invoices.join(customers))
+        .where(
+            and_(
+                invoices.c.invoice_date >= bindparam("first_day"),
+                invoices.c.invoice_date < bindparam("next_month"),
+                *extra_conditions,
+            )
+        )
+    )
+
+
+_MONTHLY_SUMMARY_STMT = _monthly_summary_stmt()
+
+# Optional customer_name filter (case-insensitive)
+_MONTHLY_SUMMARY_BY_CUSTOMER_STMT = _monthly_summary_stmt(
+    customers.c.name_lower == bindparam("customer_name_lower")
+)
+
+
 def _row_to_invoice(row) -> InvoiceOut:
     return InvoiceOut(
         id=row["id"],
@@ -39,7 +147,7 @@ def _row_to_invoice(row) -> InvoiceOut:
 
 
 @router.get("/past-due", response_model=PastDueResponse)
-def list_past_due_invoices(
+async def list_past_due_invoices(
     as_of: Optional[date] = Query(
         default=None,
         description="ISO date (YYYY-MM-DD); defaults to server 'today' in America/New_York",
@@ -60,77 +168,32 @@ def list_past_due_invoices(
 
     # Sorting
     if sort == "due_date.desc":
-        order_clause = invoices.c.due_date.desc()
+        stmt = _PAST_DUE_STMTS["due_date.desc"]
     else:
-        order_clause = invoices.c.due_date.asc()
+        stmt = _PAST_DUE_STMTS["due_date.asc"]
 
-    engine = get_engine()
+    engine = get_async_engine()
 
-    with engine.connect() as conn:
-        # Base filter: outstanding > 0 AND due_date < as_of
-        outstanding_expr = (
-            func.coalesce(invoices.c.bill_total, 0)
-            - func.coalesce(invoices.c.applied, 0)
+    async with engine.connect() as conn:
+        # Paged query, with the total count as a window column
+        result = await conn.execute(
+            stmt, {"as_of": as_of, "lim": limit, "off": offset}
         )
+        rows = result.mappings().all()
 
-        base_where = and_(
-            outstanding_expr > 0,
-            invoices.c.due_date < as_of,
-        )
+        if rows:
+            total = rows[0]["total_count"]
+        elif offset > 0:
+            # Paged past the end: no row to read the total from
+            result = await conn.execute(_PAST_DUE_COUNT_STMT, {"as_of": as_of})
+            total = result.scalar()
+        else:
+            total = 0
 
-        # Total count (before limit/offset)
-        count_stmt = select(func.count()).where(base_where)
-        total = conn.execute(count_stmt).scalar_one()
-
-        # Paged query
-        stmt = (
-            select(
-                invoices.c.invoice_number,
-                customers.c.name.label("customer_name"),
-                invoices.c.invoice_date,
-                invoices.c.due_date,
-                invoices.c.bill_total,
-                invoices.c.applied,
-                invoices.c.currency,
-                invoices.c.status,
-            )
-            .select_from(invoices.join(customers))
-            .where(base_where)
-            .order_by(order_clause)
-            .limit(limit)
-            .offset(offset)
-        )
+    # Rows already carry outstanding/days_past_due
+    items = [PastDueInvoiceItem.model_construct(**row) for row in rows]
 
-        rows = conn.execute(stmt).mappings().all()
-
-    items: List[PastDueInvoiceItem] = []
-    zero = Decimal("0")
-
-    for row in rows:
-        bill_total = row["bill_total"] or zero
-        applied = row["applied"] or zero
-        raw_outstanding = bill_total - applied
-        outstanding = raw_outstanding if raw_outstanding > zero else zero
-
-        # days_past_due = (as_of - due_date).days
-        days_past_due = (as_of - row["due_date"]).days
-
-        items.append(
-            PastDueInvoiceItem(
-                invoice_number=row["invoice_number"],
-                customer_name=row["customer_name"],
-                invoice_date=row["invoice_date"],
-                due_date=row["due_date"],
-                bill_total=bill_total,
-                applied=applied,
-                outstanding=outstanding,
-                currency=row["currency"],
-                status=row["status"],
-                days_past_due=days_past_due,
-            )
-        )
-
-    return PastDueResponse(
+    return PastDueResponse.model_construct(
         items=items,
         total=total,
         limit=limit,
@@ -139,42 +202,59 @@ def list_past_due_invoices(
 
 
 @router.get("/{invoice_number}", response_model=InvoiceOut)
-def get_invoice(invoice_number: str) -> InvoiceOut:
+async def get_invoice(invoice_number: str) -> InvoiceOut:
     """
     Look up a single invoice by its invoice_number.
     """
-    engine = get_engine()
-
-    with engine.connect() as conn:
-        stmt = (
-            select(
-                invoices.c.id,
-                invoices.c.invoice_number,
-                invoices.c.customer_id,
-                customers.c.name.label("customer_name"),
-                invoices.c.invoice_date,
-                invoices.c.due_date,
-                invoices.c.customer_po_number,
-                invoices.c.bill_total,
-                invoices.c.applied,
-                invoices.c.status,
-                invoices.c.currency,
-                invoices.c.customer_terms,
-                invoices.c.terms_days,
-            )
-            .select_from(invoices.join(customers))
-            .where(invoices.c.invoice_number == invoice_number)
-        )
+    engine = get_async_engine()
 
-        row = conn.execute(stmt).mappings().first()
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            _GET_INVOICE_STMT, {"invoice_number": invoice_number}
+        )
+        row = result.mappings().first()
 
     if row is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
     return _row_to_invoice(row)
 
+
+async def _fetch_monthly_summary(
+    month: str, first_day: date, next_month: date, customer_name: Optional[str]
+) -> MonthlySummaryOut:
+    engine = get_async_engine()
+    params = {"first_day": first_day, "next_month": next_month}
+    if customer_name is None:
+        stmt = _MONTHLY_SUMMARY_STMT
+    else:
+        stmt = _MONTHLY_SUMMARY_BY_CUSTOMER_STMT
+        params["customer_name_lower"] = customer_name.lower()
+
+    async with engine.connect() as conn:
+        result = await conn.execute(stmt, params)
+        row = result.first()
+
+    sum_bill_total = row.sum_bill_total or Decimal("0")
+    count_invoices = row.count_invoices or 0
+    currency = row.currency or "USD"
+
+    return MonthlySummaryOut(
+        month=month,
+        currency=currency,
+        sum_bill_total=sum_bill_total,
+        count_invoices=count_invoices,
+    )
+
+
+# Months that have ended don't change between ingests, so they can be cached
+# for long; the current (and any future) month can, so it only gets a short TTL.
+_closed_month_summary = ttl_cache(expire=3600)(_fetch_monthly_summary)
+_open_month_summary = ttl_cache(expire=60)(_fetch_monthly_summary)
+
+
 @router.get("/summary/month", response_model=MonthlySummaryOut)
-def monthly_summary(
+async def monthly_summary(
     month: str = Query(..., description="Target month in YYYY-MM format"),
     customer_name: Optional[str] = Query(
         default=None,
@@ -195,39 +275,9 @@ def monthly_summary(
     first_day = date(year, m, 1)
     next_month = date(year + (m == 12), (m % 12) + 1, 1)
 
-    engine = get_engine()
-    with engine.connect() as conn:
-        # Base filter on invoice_date range
-        conditions = [
-            invoices.c.invoice_date >= first_day,
-            invoices.c.invoice_date < next_month,
-        ]
-
-        # Optional customer_name filter (case-insensitive)
-        if customer_name is not None:
-            conditions.append(
-                func.lower(customers.c.name) == func.lower(customer_name)
-            )
-
-        stmt = (
-            select(
-                func.coalesce(func.sum(invoices.c.bill_total), 0).label("sum_bill_total"),
-                func.count().label("count_invoices"),
-                func.coalesce(func.min(invoices.c.currency), "USD").label("currency"),
-            )
-            .select_from(invoices.join(customers))
-            .where(and_(*conditions))
-        )
-
-        row = conn.execute(stmt).first()
-
-    sum_bill_total = row.sum_bill_total or Decimal("0")
-    count_invoices = row.count_invoices or 0
-    currency = row.currency or "USD"
-
-    return MonthlySummaryOut(
-        month=month,
-        currency=currency,
-        sum_bill_total=sum_bill_total,
-        count_invoices=count_invoices,
-    )
+    today = datetime.now(ZoneInfo("America/New_York")).date()
+    if next_month <= today:
+        fetch = _closed_month_summary
+    else:
+        fetch = _open_month_summary
+    return await fetch(month, first_day, next_month, customer_name)
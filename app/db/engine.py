@@ -1,10 +1,50 @@
 # app/db/engine.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
 DB_URL = "sqlite:///db.sqlite"  # file in project root
+ASYNC_DB_URL = "sqlite+aiosqlite:///db.sqlite"  # same file, used by the API
 
-def get_engine() -> Engine:
+# One engine (and connection pool) per process, shared by every caller.
+
+# Sync engine: scripts (init_db, ingest)
+_ENGINE = create_engine(
+    DB_URL,
+    future=True,
     # echo=True if you want to see SQL printed in the terminal
-    return create_engine(DB_URL, future=True)
+    pool_pre_ping=True,
+    pool_size=5,
+    max_overflow=10,
+)
+
+# Async engine: FastAPI handlers, so DB I/O doesn't tie up threadpool workers
+_ASYNC_ENGINE = create_async_engine(
+    ASYNC_DB_URL,
+    pool_pre_ping=True,
+    pool_size=20,
+    max_overflow=10,
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
+event.listen(_ENGINE, "connect", _set_sqlite_pragmas)
+event.listen(_ASYNC_ENGINE.sync_engine, "connect", _set_sqlite_pragmas)
+
+
+def get_engine() -> Engine:
+    return _ENGINE
+
+
+def get_async_engine() -> AsyncEngine:
+    return _ASYNC_ENGINE
@@ -2,7 +2,7 @@
 
 from sqlalchemy import (
     MetaData, Table, Column, Integer, String,
-    Numeric, Date, ForeignKey, CheckConstraint, Text
+    Numeric, Date, ForeignKey, CheckConstraint, Text, Index
 )
 
 metadata = MetaData()
@@ -12,6 +12,8 @@ customers = Table(
     metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("name", String, nullable=False, unique=True),
+    # lower(name), persisted so case-insensitive lookups are a plain index probe
+    Column("name_lower", String, nullable=False, index=True),
     Column("contact_name", String, nullable=True),
     Column("contact_phone", String, nullable=True),
     Column("contact_email", String, nullable=True),
@@ -23,6 +25,8 @@ invoices = Table(
     Column("id", Integer, primary_key=True),
     Column("invoice_number", Text, unique=True, nullable=False),
     Column("customer_id", Integer, ForeignKey("customers.id"), nullable=False),
+    # Denormalized from customers.name so read paths don't need the join
+    Column("customer_name", Text, nullable=False),
     Column("invoice_date", Date, nullable=False),
     Column("due_date", Date, nullable=False),
     Column("customer_po_number", Text),
@@ -35,3 +39,21 @@ invoices = Table(
     CheckConstraint("bill_total >= 0", name="ck_invoices_bill_total_nonneg"),
     CheckConstraint("applied >= 0", name="ck_invoices_applied_nonneg"),
 )
+
+# ---- Indexes ----
+
+Index("ix_invoices_customer_id", invoices.c.customer_id)
+Index("ix_invoices_due_date", invoices.c.due_date)
+# /invoices/summary/month: invoice_date range, then join to customers
+Index(
+    "ix_invoices_invoice_date_customer",
+    invoices.c.invoice_date,
+    invoices.c.customer_id,
+)
+# /invoices/past-due: only invoices with an outstanding balance are indexed
+Index(
+    "ix_invoices_past_due",
+    invoices.c.due_date,
+    sqlite_where=(invoices.c.bill_total - invoices.c.applied) > 0,
+    postgresql_where=(invoices.c.bill_total - invoices.c.applied) > 0,
+)
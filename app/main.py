@@ -1,13 +1,31 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.api.customers import router as customers_router
 from app.api.invoices import router as invoices_router
+from app.db.engine import get_async_engine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close pooled aiosqlite connections so the process can exit
+    await get_async_engine().dispose()
+
 
 app = FastAPI(
     title="Domeo Unicorn Inc AR API",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# List endpoints can return large JSON arrays; compress anything over ~1 KB
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
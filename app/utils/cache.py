@@ -0,0 +1,63 @@
+# app/utils/cache.py
+
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+_MISS = object()
+
+
+def ttl_cache(expire: int, maxsize: int = 1024):
+    """
+    In-process result cache for endpoint handlers, keyed by call arguments.
+
+    Works for both `def` and `async def` handlers. Entries live for `expire`
+    seconds; the oldest entry is evicted once `maxsize` is reached.
+    Exceptions (e.g. HTTPException) are not cached.
+    """
+
+    def decorator(func):
+        entries: "OrderedDict[tuple, tuple[float, object]]" = OrderedDict()
+        lock = threading.Lock()
+
+        def lookup(key):
+            with lock:
+                hit = entries.get(key)
+                if hit is not None and hit[0] > time.monotonic():
+                    return hit[1]
+            return _MISS
+
+        def store(key, result) -> None:
+            with lock:
+                entries[key] = (time.monotonic() + expire, result)
+                entries.move_to_end(key)
+                while len(entries) > maxsize:
+                    entries.popitem(last=False)
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = (args, tuple(sorted(kwargs.items())))
+                result = lookup(key)
+                if result is _MISS:
+                    result = await func(*args, **kwargs)
+                    store(key, result)
+                return result
+
+        else:
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                key = (args, tuple(sorted(kwargs.items())))
+                result = lookup(key)
+                if result is _MISS:
+                    result = func(*args, **kwargs)
+                    store(key, result)
+                return result
+
+        return wrapper
+
+    return decorator
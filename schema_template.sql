@@ -9,6 +9,7 @@ DROP TABLE IF EXISTS customers;
 CREATE TABLE customers (
     id INTEGER PRIMARY KEY,
     name TEXT NOT NULL UNIQUE,
+    name_lower TEXT NOT NULL,
     contact_name TEXT,
     contact_phone TEXT,
     contact_email TEXT
@@ -18,6 +19,7 @@ CREATE TABLE invoices (
     id INTEGER PRIMARY KEY,
     invoice_number TEXT NOT NULL UNIQUE,
     customer_id INTEGER NOT NULL,
+    customer_name TEXT NOT NULL,
     invoice_date DATE NOT NULL,
     due_date DATE NOT NULL,
     customer_po_number TEXT,
@@ -37,11 +39,18 @@ CREATE TABLE invoices (
 );
 
 -- Helpful indexes
-CREATE INDEX IF NOT EXISTS idx_invoices_customer_id
-    ON invoices (customer_id);
+CREATE INDEX IF NOT EXISTS ix_customers_name_lower
+    ON customers (name_lower);
 
-CREATE INDEX IF NOT EXISTS idx_invoices_invoice_date
-    ON invoices (invoice_date);
+CREATE INDEX IF NOT EXISTS ix_invoices_customer_id
+    ON invoices (customer_id);
 
-CREATE INDEX IF NOT EXISTS idx_invoices_due_date
+CREATE INDEX IF NOT EXISTS ix_invoices_due_date
     ON invoices (due_date);
+
+CREATE INDEX IF NOT EXISTS ix_invoices_invoice_date_customer
+    ON invoices (invoice_date, customer_id);
+
+CREATE INDEX IF NOT EXISTS ix_invoices_past_due
+    ON invoices (due_date)
+    WHERE bill_total - applied > 0;
@@ -1,9 +1,14 @@
 # scripts/ingest.py
 
 import csv
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import date, timedelta
+from functools import lru_cache
+import queue
 import re
+import threading
+from typing import Optional
 
 from app.db.engine import get_engine
 from app.db.schema import customers, invoices
@@ -17,6 +22,15 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 FILE_PATH = "data/unicorn_inc.csv"
+BATCH_SIZE = 1000  # invoices per upsert batch
+
+CSV_COLUMNS = (
+    "CustomerName", "InvoiceNumber", "InvoiceDate", "CustomerPoNumber",
+    "BillTotal", "Applied", "Status", "Currency", "ContactName",
+    "ContactPhone", "ContactEmail", "CustomerTerms", "DueDate",
+)
+
+_TERMS_RE = re.compile(r"(\d+)")
 
 
 # ---- Helpers ----
@@ -28,12 +42,30 @@ def parse_money(value: str) -> Decimal:
     return Decimal(value)
 
 
+@lru_cache(maxsize=None)
+def _parse_mdy(value: str) -> date:
+    # Invoice/due dates repeat heavily across rows, so each distinct
+    # MM/DD/YY string is only parsed once per process.
+    # Equivalent to datetime.strptime(value, "%m/%d/%y").date() without
+    # interpreting the format string on every call.
+    mm, dd, yy = value.split("/")
+    if (
+        len(mm) > 2 or len(dd) > 2 or len(yy) != 2
+        or not (mm.isdigit() and dd.isdigit() and yy.isdigit())
+    ):
+        raise ValueError(f"time data {value!r} does not match format '%m/%d/%y'")
+    year = int(yy)
+    # Same pivot as strptime's %y: 69-99 -> 1900s, 00-68 -> 2000s
+    year += 1900 if year >= 69 else 2000
+    return date(year, int(mm), int(dd))
+
+
 def parse_invoice_date(value: str):
     value = value.strip()
     if not value:
         return None
     value = value.split()[0]
-    return datetime.strptime(value, "%m/%d/%y").date()
+    return _parse_mdy(value)
 
 
 def parse_due_date_raw(value: str):
@@ -43,29 +75,34 @@ def parse_due_date_raw(value: str):
     if not value:
         return None
     value = value.split()[0]
-    return datetime.strptime(value, "%m/%d/%y").date()
+    return _parse_mdy(value)
 
 
+@lru_cache(maxsize=None)
 def extract_terms_days(terms: str):
     if terms is None:
         return None
     terms = terms.strip()
     if not terms:
         return None
-    m = re.search(r"(\d+)", terms)
+    m = _TERMS_RE.search(terms)
     if not m:
         return None
     return int(m.group(1))
 
 
-def upsert_invoice(conn, invoice_row: dict) -> None:
+def upsert_invoices(conn, invoice_rows: list) -> None:
     """
-    Insert or update an invoice by InvoiceNumber (idempotent ingest).
+    Insert or update invoices by InvoiceNumber (idempotent ingest).
+
+    One compiled statement is executed with the whole parameter list
+    (executemany), rather than one statement per invoice.
 
-    invoice_row: dict mapping column names to values, e.g.
+    invoice_rows: list of dicts mapping column names to values, e.g.
       {
         "invoice_number": "...",
         "customer_id": 1,
+        "customer_name": "...",
         "invoice_date": date(...),
         "due_date": date(...),
         "customer_po_number": "...",
@@ -77,11 +114,15 @@ def upsert_invoice(conn, invoice_row: dict) -> None:
         "terms_days": 30,
       }
     """
-    stmt = sqlite_insert(invoices).values(**invoice_row)
+    if not invoice_rows:
+        return
+
+    stmt = sqlite_insert(invoices)
 
     # On conflict by invoice_number, update the mutable fields
     update_cols = {
         "customer_id": stmt.excluded.customer_id,
+        "customer_name": stmt.excluded.customer_name,
         "invoice_date": stmt.excluded.invoice_date,
         "due_date": stmt.excluded.due_date,
         "customer_po_number": stmt.excluded.customer_po_number,
@@ -98,13 +139,68 @@ def upsert_invoice(conn, invoice_row: dict) -> None:
         set_=update_cols,
     )
 
-    conn.execute(stmt)
+    conn.execute(stmt, invoice_rows)
 
 
-def parse_unicorn_csv(file_path: str = FILE_PATH):
+def upsert_customers(conn, customers_list: list) -> dict:
+    """
+    Insert or update customers by name, in place, and return {name: id}
+    for the customers given.
+
+    Existing rows keep their id (so invoices already pointing at them stay
+    valid); new customers get the next id from the database.
+    """
+    if not customers_list:
+        return {}
+
+    stmt = sqlite_insert(customers)
+
+    # On conflict by name, refresh the contact fields. RETURNING yields a row
+    # for inserted and updated customers alike, so the table isn't re-read.
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[customers.c.name],
+        set_={
+            "name_lower": stmt.excluded.name_lower,
+            "contact_name": stmt.excluded.contact_name,
+            "contact_phone": stmt.excluded.contact_phone,
+            "contact_email": stmt.excluded.contact_email,
+        },
+    ).returning(customers.c.name, customers.c.id)
+
+    rows = conn.execute(
+        stmt,
+        [
+            {
+                "name": c["name"],
+                "name_lower": c["name"].lower(),
+                "contact_name": c["contact_name"],
+                "contact_phone": c["contact_phone"],
+                "contact_email": c["contact_email"],
+            }
+            for c in customers_list
+        ],
+    )
+    return dict(rows.all())
+
+
+def iter_unicorn_csv(
+    file_path: str = FILE_PATH,
+    stats: Optional[dict] = None,
+    batch_size: int = BATCH_SIZE,
+):
+    """
+    Parse the CSV, yielding (customers_batch, invoices_batch) every
+    `batch_size` invoices.
+
+    customers_batch holds copies of the customers that are new, or had a
+    missing contact field filled in, since the previous batch; upserting it
+    before invoices_batch keeps every invoice's customer present.
+    If given, `stats` is filled in once the file is exhausted.
+    """
     customers_by_name = {}
-    invoices_list = []
-    next_customer_id = 1
+    dirty_customers = {}
+    invoices_batch = []
+    n_invoices = 0
 
     n_rows = 0
     n_errors = 0
@@ -115,66 +211,124 @@ def parse_unicorn_csv(file_path: str = FILE_PATH):
     duplicate_invoice_examples: list[str] = []
     duplicate_invoice_count = 0
 
+    def fill_stats() -> None:
+        if stats is None:
+            return
+
+        stats.update({
+            "n_rows": n_rows,
+            "n_customers": len(customers_by_name),
+            "n_invoices": n_invoices,
+            "n_errors": n_errors,
+            "error_examples": error_examples,
+            # NEW
+            "n_duplicate_invoices": duplicate_invoice_count,
+            "duplicate_invoice_examples": duplicate_invoice_examples,
+        })
+
     with open(file_path, newline="") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        # Like DictReader, the header is the first non-blank line
+        header = next((r for r in reader if r), None)
+        if header is None:
+            # Empty file: nothing to check or parse, so just report zeroed stats
+            fill_stats()
+            return
+
+        n_cols = len(header)
+        idx = {name: i for i, name in enumerate(header)}
+
+        # Every row would fail without these, so reject the file up front
+        missing = [name for name in CSV_COLUMNS if name not in idx]
+        if missing:
+            raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+
+        # Positional column indices, resolved once for the whole file
+        i_customer_name = idx["CustomerName"]
+        i_invoice_number = idx["InvoiceNumber"]
+        i_invoice_date = idx["InvoiceDate"]
+        i_customer_po_number = idx["CustomerPoNumber"]
+        i_bill_total = idx["BillTotal"]
+        i_applied = idx["Applied"]
+        i_status = idx["Status"]
+        i_currency = idx["Currency"]
+        i_contact_name = idx["ContactName"]
+        i_contact_phone = idx["ContactPhone"]
+        i_contact_email = idx["ContactEmail"]
+        i_customer_terms = idx["CustomerTerms"]
+        i_due_date = idx["DueDate"]
 
         for row in reader:
+            # Match DictReader: skip blank lines, pad short rows with None
+            if not row:
+                continue
+            if len(row) < n_cols:
+                row += [None] * (n_cols - len(row))
+
             n_rows += 1
 
             try:
+                contact_name = row[i_contact_name]
+                contact_phone = row[i_contact_phone]
+                contact_email = row[i_contact_email]
+                customer_terms = row[i_customer_terms]
+                status = row[i_status]
+                currency = row[i_currency]
+
                 # ----- CUSTOMER HANDLING -----
-                cname = row["CustomerName"].strip()
+                cname = row[i_customer_name].strip()
 
                 if cname not in customers_by_name:
                     customers_by_name[cname] = {
-                        "customer_id": next_customer_id,
                         "name": cname,
-                        "contact_name": row["ContactName"].strip() if row["ContactName"] else None,
-                        "contact_phone": row["ContactPhone"].strip() if row["ContactPhone"] else None,
-                        "contact_email": row["ContactEmail"].strip() if row["ContactEmail"] else None,
+                        "contact_name": contact_name.strip() if contact_name else None,
+                        "contact_phone": contact_phone.strip() if contact_phone else None,
+                        "contact_email": contact_email.strip() if contact_email else None,
                     }
-                    next_customer_id += 1
+                    dirty_customers[cname] = customers_by_name[cname]
                 else:
                     cust = customers_by_name[cname]
-                    if not cust["contact_name"] and row["ContactName"]:
-                        cust["contact_name"] = row["ContactName"].strip()
-                    if not cust["contact_phone"] and row["ContactPhone"]:
-                        cust["contact_phone"] = row["ContactPhone"].strip()
-                    if not cust["contact_email"] and row["ContactEmail"]:
-                        cust["contact_email"] = row["ContactEmail"].strip()
-
-                customer_id = customers_by_name[cname]["customer_id"]
+                    if not cust["contact_name"] and contact_name:
+                        cust["contact_name"] = contact_name.strip()
+                        dirty_customers[cname] = cust
+                    if not cust["contact_phone"] and contact_phone:
+                        cust["contact_phone"] = contact_phone.strip()
+                        dirty_customers[cname] = cust
+                    if not cust["contact_email"] and contact_email:
+                        cust["contact_email"] = contact_email.strip()
+                        dirty_customers[cname] = cust
 
                 # ----- MONEY -----
-                bill_total = parse_money(row["BillTotal"])
-                applied = parse_money(row["Applied"])
+                bill_total = parse_money(row[i_bill_total])
+                applied = parse_money(row[i_applied])
 
                 # ----- DATES -----
-                invoice_date = parse_invoice_date(row["InvoiceDate"])
-                terms_days = extract_terms_days(row["CustomerTerms"])
-                due_date = parse_due_date_raw(row["DueDate"])
+                invoice_date = parse_invoice_date(row[i_invoice_date])
+                terms_days = extract_terms_days(customer_terms)
+                due_date = parse_due_date_raw(row[i_due_date])
 
                 if due_date is None and invoice_date is not None and terms_days is not None:
                     due_date = invoice_date + timedelta(days=terms_days)
 
+                invoice_number = row[i_invoice_number].strip()
+
                 # ----- INVOICE RECORD -----
                 invoice_record = {
-                    "invoice_number": row["InvoiceNumber"].strip(),
-                    "customer_id": customer_id,
+                    "invoice_number": invoice_number,
+                    "customer_name": cname,
                     "invoice_date": invoice_date,
                     "due_date": due_date,
-                    "customer_po_number": row["CustomerPoNumber"].strip(),
+                    "customer_po_number": row[i_customer_po_number].strip(),
                     "bill_total": bill_total,
                     "applied": applied,
-                    "status": row["Status"].strip() if row["Status"] else None,
-                    "currency": row["Currency"].strip() if row["Currency"] else None,
-                    "customer_terms": row["CustomerTerms"].strip() if row["CustomerTerms"] else None,
+                    "status": status.strip() if status else None,
+                    "currency": currency.strip() if currency else None,
+                    "customer_terms": customer_terms.strip() if customer_terms else None,
                     "terms_days": terms_days,
                 }
 
-                invoices_list.append(invoice_record)
-
-                invoice_number = row["InvoiceNumber"].strip()
+                invoices_batch.append(invoice_record)
+                n_invoices += 1
 
                 # NEW: duplicate detection
                 if invoice_number in seen_invoice_numbers:
@@ -194,55 +348,111 @@ def parse_unicorn_csv(file_path: str = FILE_PATH):
                     error_examples.append(
                         {
                             "row_number": n_rows,
-                            "row": dict(row),
+                            "row": dict(zip(header, row)),
                             "error": repr(e),
                         }
                     )
 
-    customers_list = list(customers_by_name.values())
+            if len(invoices_batch) >= batch_size:
+                yield [dict(c) for c in dirty_customers.values()], invoices_batch
+                dirty_customers = {}
+                invoices_batch = []
 
-    stats = {
-        "n_rows": n_rows,
-        "n_customers": len(customers_by_name),
-        "n_invoices": len(invoices_list),
-        "n_errors": n_errors,
-        "error_examples": error_examples,
-        # NEW
-        "n_duplicate_invoices": duplicate_invoice_count,
-        "duplicate_invoice_examples": duplicate_invoice_examples,
-    }
-    return customers_list, invoices_list, stats
+    if dirty_customers or invoices_batch:
+        yield [dict(c) for c in dirty_customers.values()], invoices_batch
+
+    fill_stats()
+
+
+def parse_unicorn_csv(file_path: str = FILE_PATH):
+    customers_by_name = {}
+    invoices_list = []
+    stats = {}
+
+    for customers_batch, invoices_batch in iter_unicorn_csv(file_path, stats):
+        # Later copies carry filled-in contacts; dict order keeps first-seen order
+        for c in customers_batch:
+            customers_by_name[c["name"]] = c
+        invoices_list.extend(invoices_batch)
 
+    customers_list = list(customers_by_name.values())
+    return customers_list, invoices_list, stats
 
 
 def load_into_db(customers_list, invoices_list):
     engine = get_engine()
     with engine.begin() as conn:
-        # Rebuild customers from scratch (deterministic)
-        conn.execute(customers.delete())
-
-        conn.execute(
-            customers.insert(),
-            [
-                {
-                    "id": c["customer_id"],
-                    "name": c["name"],
-                    "contact_name": c["contact_name"],
-                    "contact_phone": c["contact_phone"],
-                    "contact_email": c["contact_email"],
-                }
-                for c in customers_list
-            ],
-        )
+        # Idempotent customers: upsert by name, keeping existing ids
+        customer_ids = upsert_customers(conn, customers_list)
 
-        # Idempotent invoices: upsert by invoice_number
+        # Parsed invoices carry only customer_name; attach the stored ids
         for inv in invoices_list:
-            upsert_invoice(conn, inv)
+            inv["customer_id"] = customer_ids[inv["customer_name"]]
+
+        # Idempotent invoices: upsert by invoice_number
+        upsert_invoices(conn, invoices_list)
+
+
+def load_csv_into_db(file_path: str = FILE_PATH, batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Parse and load the CSV as a producer/consumer pipeline.
+
+    A worker thread parses batches onto a bounded queue while this thread
+    upserts them, so CSV parsing overlaps with SQLite writes. Everything is
+    written in one transaction; if parsing fails, nothing is committed.
+    Returns the same stats dict as parse_unicorn_csv.
+    """
+    stats = {}
+    batches = queue.Queue(maxsize=4)
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            for batch in iter_unicorn_csv(file_path, stats, batch_size):
+                if stop.is_set():
+                    break
+                batches.put(batch)
+        finally:
+            batches.put(None)  # sentinel: no more batches
+
+    engine = get_engine()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        producer = executor.submit(produce)
+        drained = False
+
+        try:
+            with engine.begin() as conn:
+                customer_ids = {}
+                while True:
+                    batch = batches.get()
+                    if batch is None:
+                        drained = True
+                        break
+                    customers_batch, invoices_batch = batch
+
+                    # Customers from earlier batches keep their ids
+                    customer_ids.update(upsert_customers(conn, customers_batch))
+
+                    for inv in invoices_batch:
+                        inv["customer_id"] = customer_ids[inv["customer_name"]]
+
+                    upsert_invoices(conn, invoices_batch)
+
+                # Re-raise any parser error before the transaction commits
+                producer.result()
+        except BaseException:
+            # Unblock the parser (it may be waiting on a full queue) so the
+            # executor can shut down, then surface the original error
+            stop.set()
+            while not drained:
+                drained = batches.get() is None
+            raise
+
+    return stats
 
 
 def main():
-    customers_list, invoices_list, stats = parse_unicorn_csv(FILE_PATH)
-    load_into_db(customers_list, invoices_list)
+    stats = load_csv_into_db(FILE_PATH)
 
     logger.info(f"Total CSV rows read:   {stats['n_rows']}")
     logger.info(f"Unique customers:      {stats['n_customers']}")